@@ -1,14 +1,131 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import StreamingResponse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import List, Optional, Tuple
+import asyncio
+import multiprocessing
 import tempfile
 import os
+import numpy as np
 from services.excel_parser import ExcelParser
 from services.report_generator import ReportGenerator
-from packing.guillotine import GuillotinePacker
-from models.schemas import CuttingResult
+from packing.guillotine import GuillotinePacker, HEURISTICS
+from models.schemas import CuttingResult, Piece
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Worker processes packing the same input with each heuristic in parallel, shared by all
+# requests. Started and shut down with the application; None when fewer than two CPUs are
+# available, in which case only the default heuristic is packed in a worker thread
+_packing_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_packing_pool():
+    """Start the packing worker processes (called on application startup)"""
+    global _packing_pool
+    workers = os.cpu_count() or 1
+    if workers < 2:
+        return
+    
+    # Don't fork the running server; forkserver children start from a clean process
+    # that has already loaded the compiled packing kernels
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['packing.guillotine'])
+    else:
+        context = multiprocessing.get_context('spawn')
+    _packing_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def shutdown_packing_pool():
+    """Stop the packing worker processes (called on application shutdown)"""
+    global _packing_pool
+    if _packing_pool is not None:
+        _packing_pool.shutdown(cancel_futures=True)
+        _packing_pool = None
+
+
+def _restart_packing_pool(broken: ProcessPoolExecutor):
+    """Replace a pool that lost a worker process, unless another request already did"""
+    if _packing_pool is broken:
+        broken.shutdown(wait=False)
+        start_packing_pool()
+
+
+async def _save_upload(file: UploadFile) -> str:
+    """Stream uploaded file to a temporary file and return its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            tmp.write(chunk)
+        return tmp.name
+
+
+def _parse_excel(tmp_path: str) -> List[Piece]:
+    """Parse saved Excel file (blocking, run in executor)"""
+    try:
+        parser = ExcelParser()
+        return parser.parse_excel(tmp_path)
+    finally:
+        # Clean up temp file
+        os.unlink(tmp_path)
+
+
+def _generate_report(result: CuttingResult) -> BytesIO:
+    """Render the PNG report (blocking, run in executor)"""
+    generator = ReportGenerator()
+    return generator.generate_report(result, material_name="Wood Board")
+
+
+async def _calculate(file: UploadFile) -> Tuple[List[Piece], CuttingResult]:
+    """Parse uploaded Excel file and return the layout using the fewest boards"""
+    # Save uploaded file temporarily
+    tmp_path = await _save_upload(file)
+    
+    # Parse Excel off the event loop
+    loop = asyncio.get_running_loop()
+    pieces = await loop.run_in_executor(None, _parse_excel, tmp_path)
+    
+    if not pieces:
+        raise HTTPException(status_code=400, detail="No valid pieces found in Excel file")
+    
+    # Run packing algorithm and build the result models for the best layout only
+    board_placements, rejected = await _pack_best(pieces)
+    packer = GuillotinePacker(board_length=2400, board_width=1200)
+    result = await loop.run_in_executor(None, packer.build_result,
+                                        pieces, board_placements, rejected)
+    return pieces, result
+
+
+async def _pack_best(pieces: List[Piece]) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Pack pieces with every heuristic in the process pool and keep the layout
+    using the fewest boards"""
+    loop = asyncio.get_running_loop()
+    pool = _packing_pool
+    
+    if pool is not None:
+        try:
+            layouts = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool,
+                    GuillotinePacker(board_length=2400, board_width=1200,
+                                     heuristic=heuristic).pack_placements,
+                    pieces
+                )
+                for heuristic in HEURISTICS
+            ))
+            return min(layouts, key=lambda layout: len(layout[0]))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for running out of memory); replace the pool
+            # and pack this request in-process
+            _restart_packing_pool(pool)
+    
+    packer = GuillotinePacker(board_length=2400, board_width=1200)
+    return await loop.run_in_executor(None, packer.pack_placements, pieces)
+
 
 @router.post("/calculate")
 async def calculate_cutting(file: UploadFile = File(...)):
@@ -20,25 +137,7 @@ async def calculate_cutting(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are allowed")
     
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-        
-        # Parse Excel
-        parser = ExcelParser()
-        pieces = parser.parse_excel(tmp_path)
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
-        
-        if not pieces:
-            raise HTTPException(status_code=400, detail="No valid pieces found in Excel file")
-        
-        # Run packing algorithm
-        packer = GuillotinePacker(board_length=2400, board_width=1200)
-        result = packer.pack_pieces(pieces)
+        pieces, result = await _calculate(file)
         
         return {
             "success": True,
@@ -61,29 +160,11 @@ async def calculate_and_generate_report(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are allowed")
     
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-        
-        # Parse Excel
-        parser = ExcelParser()
-        pieces = parser.parse_excel(tmp_path)
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
-        
-        if not pieces:
-            raise HTTPException(status_code=400, detail="No valid pieces found in Excel file")
-        
-        # Run packing algorithm
-        packer = GuillotinePacker(board_length=2400, board_width=1200)
-        result = packer.pack_pieces(pieces)
+        _, result = await _calculate(file)
         
-        # Generate report
-        generator = ReportGenerator()
-        report_buffer = generator.generate_report(result, material_name="Wood Board")
+        # Generate report off the event loop
+        loop = asyncio.get_running_loop()
+        report_buffer = await loop.run_in_executor(None, _generate_report, result)
         
         return StreamingResponse(
             report_buffer,
@@ -1,11 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from api.routes import router, start_packing_pool, shutdown_packing_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Packing worker processes live as long as the application
+    start_packing_pool()
+    try:
+        yield
+    finally:
+        shutdown_packing_pool()
+
 
 app = FastAPI(
     title="Wood Cutting Optimizer API",
     description="AutoCUT-style cutting optimization for wood boards",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
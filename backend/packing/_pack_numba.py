@@ -0,0 +1,188 @@
+import numpy as np
+from numba import njit, int16, int32, int64, types
+
+# Piece columns
+LENGTH = 0
+WIDTH = 1
+LENGTH_CONSTRAINT = 2
+WIDTH_CONSTRAINT = 3
+INDEX = 4
+
+# Free rectangle selection heuristics
+FIRST_FIT = 0
+BEST_AREA_FIT = 1
+BEST_SHORT_SIDE_FIT = 2
+
+# Minimum size (mm) a free rectangle must exceed on both sides to be kept
+MIN_RECT_SIZE = 10
+
+
+@njit([types.UniTuple(int64, 2)(int16[::1], int16[:, ::1], int64, int64),
+       types.UniTuple(int64, 2)(int32[::1], int32[:, ::1], int64, int64)],
+      cache=True, nogil=True)
+def try_place(piece, rects, n_rects, heuristic):
+    """Choose the free rectangle to place the piece in according to heuristic.
+
+    Returns (rect_idx, rotated); rect_idx is -1 when the piece does not fit.
+    """
+    length = piece[LENGTH]
+    width = piece[WIDTH]
+    length_constraint = piece[LENGTH_CONSTRAINT] != 0
+    width_constraint = piece[WIDTH_CONSTRAINT] != 0
+
+    # Lowest score any rectangle can get, used to stop the scan early
+    if heuristic == BEST_AREA_FIT:
+        best_possible = length * width
+    else:
+        best_possible = 0
+
+    best_idx = -1
+    best_rotated = 0
+    best_score = 0
+
+    for i in range(n_rects):
+        rect_w = rects[i, 2]
+        rect_h = rects[i, 3]
+
+        # Normal orientation (length along board length unless width-constrained)
+        if length <= rect_w and width <= rect_h and not width_constraint:
+            rotated = 0
+            placed_w = length
+            placed_h = width
+        # Rotated orientation (only if no constraints)
+        elif (not length_constraint and not width_constraint
+              and width <= rect_w and length <= rect_h):
+            rotated = 1
+            placed_w = width
+            placed_h = length
+        else:
+            continue
+
+        if heuristic == BEST_AREA_FIT:
+            score = rect_w * rect_h
+        elif heuristic == BEST_SHORT_SIDE_FIT:
+            score = min(rect_w - placed_w, rect_h - placed_h)
+        else:
+            score = 0
+
+        if best_idx < 0 or score < best_score:
+            best_idx = i
+            best_rotated = rotated
+            best_score = score
+
+            if score == best_possible:
+                break
+
+    return best_idx, best_rotated
+
+
+@njit([types.UniTuple(int64, 2)(int16[:, ::1], int64, int64, int64, int32[:, ::1], int64[::1]),
+       types.UniTuple(int64, 2)(int32[:, ::1], int64, int64, int64, int32[:, ::1], int64[::1])],
+      cache=True, nogil=True)
+def pack_board(pieces, board_length, board_width, heuristic, out_placed, out_remaining):
+    """Pack as many pieces as possible into a single board.
+
+    pieces is an (N, 5) int16 or int32 array of (length, width, length_constraint,
+    width_constraint, index) rows in packing order. Placements are written to
+    out_placed as (row, x, y, length, width, rotated) and the rows of pieces
+    that did not fit to out_remaining. heuristic selects the free rectangle
+    (FIRST_FIT, BEST_AREA_FIT or BEST_SHORT_SIDE_FIT).
+
+    Returns (n_placed, n_remaining).
+    """
+    n_pieces = pieces.shape[0]
+
+    # Rectangles narrower than the smallest piece side can never be used
+    min_side = board_length
+    for p in range(n_pieces):
+        min_side = min(min_side, pieces[p, LENGTH], pieces[p, WIDTH])
+    min_side = max(min_side, MIN_RECT_SIZE + 1)
+
+    # Free rectangles as (x, y, w, h); each placement adds at most one net rectangle
+    rects = np.empty((n_pieces + 2, 4), dtype=pieces.dtype)
+    rects[0, 0] = 0
+    rects[0, 1] = 0
+    rects[0, 2] = board_length
+    rects[0, 3] = board_width
+    n_rects = 1
+
+    # Upper bounds on free rectangle width/height. Splits only produce smaller
+    # rectangles, so the bounds stay valid and are tightened after a failed search.
+    max_w = board_length
+    max_h = board_width
+
+    n_placed = 0
+    n_remaining = 0
+
+    for p in range(n_pieces):
+        length = pieces[p, LENGTH]
+        width = pieces[p, WIDTH]
+        unconstrained = pieces[p, LENGTH_CONSTRAINT] == 0 and pieces[p, WIDTH_CONSTRAINT] == 0
+
+        # Fast reject pieces that cannot fit any free rectangle in either orientation
+        fits_normal = length <= max_w and width <= max_h and pieces[p, WIDTH_CONSTRAINT] == 0
+        fits_rotated = unconstrained and width <= max_w and length <= max_h
+        if fits_normal or fits_rotated:
+            i, rotated = try_place(pieces[p], rects, n_rects, heuristic)
+        else:
+            i = -1
+
+        if i < 0:
+            out_remaining[n_remaining] = p
+            n_remaining += 1
+
+            # Tighten the bounds to the current free rectangles
+            if fits_normal or fits_rotated:
+                max_w = 0
+                max_h = 0
+                for j in range(n_rects):
+                    max_w = max(max_w, rects[j, 2])
+                    max_h = max(max_h, rects[j, 3])
+            continue
+
+        if rotated:
+            placed_w = pieces[p, WIDTH]
+            placed_h = pieces[p, LENGTH]
+        else:
+            placed_w = pieces[p, LENGTH]
+            placed_h = pieces[p, WIDTH]
+
+        rect_x = rects[i, 0]
+        rect_y = rects[i, 1]
+        rect_w = rects[i, 2]
+        rect_h = rects[i, 3]
+
+        out_placed[n_placed, 0] = p
+        out_placed[n_placed, 1] = rect_x
+        out_placed[n_placed, 2] = rect_y
+        out_placed[n_placed, 3] = placed_w
+        out_placed[n_placed, 4] = placed_h
+        out_placed[n_placed, 5] = rotated
+        n_placed += 1
+
+        # Remove used rectangle; only First-Fit depends on the order of the others,
+        # the other heuristics swap the last rectangle into its slot
+        if heuristic == FIRST_FIT:
+            for j in range(i, n_rects - 1):
+                rects[j] = rects[j + 1]
+        else:
+            rects[i] = rects[n_rects - 1]
+        n_rects -= 1
+
+        # Right rectangle
+        if rect_w - placed_w >= min_side and rect_h >= min_side:
+            rects[n_rects, 0] = rect_x + placed_w
+            rects[n_rects, 1] = rect_y
+            rects[n_rects, 2] = rect_w - placed_w
+            rects[n_rects, 3] = rect_h
+            n_rects += 1
+
+        # Top rectangle
+        if placed_w >= min_side and rect_h - placed_h >= min_side:
+            rects[n_rects, 0] = rect_x
+            rects[n_rects, 1] = rect_y + placed_h
+            rects[n_rects, 2] = placed_w
+            rects[n_rects, 3] = rect_h - placed_h
+            n_rects += 1
+
+    return n_placed, n_remaining
@@ -1,22 +1,40 @@
-from typing import List, Tuple, Optional
+from typing import List, Tuple
+import numpy as np
 from models.schemas import Piece, PlacedPiece, Board, CuttingResult
+from packing._pack_numba import pack_board, INDEX, FIRST_FIT, BEST_AREA_FIT, BEST_SHORT_SIDE_FIT
 
 
-class Rectangle:
-    """Helper class for guillotine packing"""
-    def __init__(self, x: int, y: int, width: int, height: int):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
+# Free rectangle selection heuristics supported by the packer
+HEURISTICS = {
+    'best_area_fit': BEST_AREA_FIT,
+    'best_short_side_fit': BEST_SHORT_SIDE_FIT,
+    'first_fit': FIRST_FIT,
+}
+
+# Placements of a board as a structured array (piece is the index into the input pieces);
+# converted to PlacedPiece models at the end
+PLACEMENT_DTYPE = np.dtype([
+    ('piece', np.int32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('length', np.int32),
+    ('width', np.int32),
+    ('rotated', np.bool_),
+])
 
 
 class GuillotinePacker:
-    """2D bin packing using guillotine algorithm with First-Fit Decreasing"""
+    """2D bin packing using guillotine algorithm with decreasing-area ordering
+    and a configurable free rectangle heuristic (Best-Area-Fit by default)"""
     
-    def __init__(self, board_length: int = 2400, board_width: int = 1200):
+    def __init__(self, board_length: int = 2400, board_width: int = 1200,
+                 heuristic: str = 'best_area_fit'):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown packing heuristic: {heuristic}")
+        
         self.board_length = board_length  # mm
         self.board_width = board_width    # mm
+        self.heuristic = heuristic
         
     def pack_pieces(self, pieces: List[Piece]) -> CuttingResult:
         """
@@ -26,53 +44,65 @@ class GuillotinePacker:
         3. Sort by area (descending), constrained pieces first
         4. Pack using guillotine cuts
         """
-        # Expand pieces by quantity
-        expanded_pieces = []
-        rejected_pieces = []
-        
-        for piece in pieces:
-            for i in range(piece.quantity):
-                # Convert cm to mm
-                length_mm = piece.length * 10
-                width_mm = piece.width * 10
-                
-                # Check if piece fits on board (with or without rotation)
-                can_fit = False
-                if (length_mm <= self.board_length and width_mm <= self.board_width):
-                    can_fit = True
-                elif (width_mm <= self.board_length and length_mm <= self.board_width):
-                    # Can fit if rotated
-                    if not piece.length_constraint and not piece.width_constraint:
-                        can_fit = True
-                
-                if can_fit:
-                    expanded_pieces.append({
-                        'name': piece.name,
-                        'length': length_mm,
-                        'width': width_mm,
-                        'length_constraint': piece.length_constraint,
-                        'width_constraint': piece.width_constraint,
-                        'area': length_mm * width_mm
-                    })
-                else:
-                    rejected_pieces.append(piece)
+        board_placements, rejected = self.pack_placements(pieces)
+        return self.build_result(pieces, board_placements, rejected)
+    
+    def pack_placements(self, pieces: List[Piece]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Pack pieces without building the result models. Returns the PLACEMENT_DTYPE
+        array of each board and the indices of rejected pieces (one per copy)
+        """
+        # Piece types as (length, width, length_constraint, width_constraint, index) rows, cm -> mm
+        base = np.array(
+            [(round(p.length * 10), round(p.width * 10),
+              p.length_constraint, p.width_constraint, index)
+             for index, p in enumerate(pieces)],
+            dtype=np.int64
+        ).reshape(-1, 5)
+        quantities = np.array([p.quantity for p in pieces], dtype=np.int64).clip(min=0)
+        
+        length = base[:, 0]
+        width = base[:, 1]
+        width_constrained = base[:, 3] != 0
+        constrained = (base[:, 2] != 0) | width_constrained
+        area = length * width
+        
+        # Check if pieces fit on board, using the same orientation rule as the packing kernel
+        # (normal orientation unless width-constrained, rotation only allowed without constraints)
+        fits_normal = (length <= self.board_length) & (width <= self.board_width) & ~width_constrained
+        fits_rotated = (width <= self.board_length) & (length <= self.board_width) & ~constrained
+        can_fit = (fits_normal | fits_rotated) & (length > 0) & (width > 0)
+        
+        rejected = np.flatnonzero(~can_fit)
+        rejected = np.repeat(rejected, quantities[rejected])
         
         # Sort: constrained pieces first, then by area descending
-        expanded_pieces.sort(key=lambda p: (
-            not (p['length_constraint'] or p['width_constraint']),  # False < True, so constrained first
-            -p['area']  # Then by area descending
-        ))
+        order = np.lexsort((-area, ~constrained))
+        order = order[can_fit[order]]
+        
+        # Expand pieces by quantity (copies of a piece type share its sort key). Accepted
+        # pieces have positive sizes within the board, so int16 holds them unless the board
+        # or piece count is larger
+        if max(self.board_length, self.board_width, len(pieces)) <= np.iinfo(np.int16).max:
+            dtype = np.int16
+        else:
+            dtype = np.int32
+        piece_array = np.repeat(base[order].astype(dtype), quantities[order], axis=0)
         
         # Pack pieces into boards
-        boards = []
-        board_number = 1
+        board_placements = []
         
-        while expanded_pieces:
-            board, remaining = self._pack_single_board(expanded_pieces)
-            boards.append(board)
-            board.board_number = board_number
-            board_number += 1
-            expanded_pieces = remaining
+        while len(piece_array):
+            placed, piece_array = self._pack_single_board(piece_array)
+            board_placements.append(placed)
+        
+        return board_placements, rejected
+    
+    def build_result(self, pieces: List[Piece], board_placements: List[np.ndarray],
+                     rejected: np.ndarray) -> CuttingResult:
+        """Convert the output of pack_placements into a CuttingResult"""
+        boards = [self._build_board(board_number, pieces, placed)
+                  for board_number, placed in enumerate(board_placements, start=1)]
         
         # Calculate overall utilization
         total_area = self.board_length * self.board_width * len(boards)
@@ -84,112 +114,43 @@ class GuillotinePacker:
             boards=boards,
             total_boards=len(boards),
             overall_utilization=round(overall_utilization, 2),
-            rejected_pieces=rejected_pieces
+            rejected_pieces=[pieces[index] for index in rejected.tolist()]
         )
     
-    def _pack_single_board(self, pieces: List[dict]) -> Tuple[Board, List[dict]]:
+    def _pack_single_board(self, piece_array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Pack as many pieces as possible into a single board"""
-        free_rectangles = [Rectangle(0, 0, self.board_length, self.board_width)]
-        placed_pieces = []
-        remaining_pieces = []
-        
-        for piece in pieces:
-            placed = False
-            
-            # Try to place the piece in free rectangles
-            for i, rect in enumerate(free_rectangles):
-                placement = self._try_place_piece(piece, rect)
-                
-                if placement:
-                    placed_piece, new_rects = placement
-                    placed_pieces.append(placed_piece)
-                    
-                    # Remove used rectangle and add new ones
-                    free_rectangles.pop(i)
-                    free_rectangles.extend(new_rects)
-                    
-                    # Merge overlapping rectangles (simplified)
-                    free_rectangles = self._merge_rectangles(free_rectangles)
-                    
-                    placed = True
-                    break
-            
-            if not placed:
-                remaining_pieces.append(piece)
-        
+        placed = np.empty((len(piece_array), 6), dtype=np.int32)
+        remaining = np.empty(len(piece_array), dtype=np.int64)
+        n_placed, n_remaining = pack_board(piece_array, self.board_length, self.board_width,
+                                           HEURISTICS[self.heuristic], placed, remaining)
+        placed = placed[:n_placed]
+        
+        placements = np.empty(n_placed, dtype=PLACEMENT_DTYPE)
+        placements['piece'] = piece_array[placed[:, 0], INDEX]
+        placements['x'] = placed[:, 1]
+        placements['y'] = placed[:, 2]
+        placements['length'] = placed[:, 3]
+        placements['width'] = placed[:, 4]
+        placements['rotated'] = placed[:, 5]
+        
+        return placements, piece_array[remaining[:n_remaining]]
+    
+    def _build_board(self, board_number: int, pieces: List[Piece], placements: np.ndarray) -> Board:
+        """Convert placements of a packed board into a Board model"""
         # Calculate utilization
-        used_area = sum(p.length * p.width for p in placed_pieces)
+        used_area = int((placements['length'].astype(np.int64) * placements['width']).sum())
         total_area = self.board_length * self.board_width
         utilization = (used_area / total_area * 100) if total_area > 0 else 0
         
-        board = Board(
-            board_number=0,  # Will be set by caller
+        return Board(
+            board_number=board_number,
             length=self.board_length,
             width=self.board_width,
-            pieces=placed_pieces,
+            pieces=[
+                PlacedPiece(name=pieces[piece].name, length=length, width=width,
+                            x=x, y=y, rotated=rotated)
+                for piece, x, y, length, width, rotated in placements.tolist()
+            ],
             utilization=round(utilization, 2),
             waste_area=total_area - used_area
         )
-        
-        return board, remaining_pieces
-    
-    def _try_place_piece(self, piece: dict, rect: Rectangle) -> Optional[Tuple[PlacedPiece, List[Rectangle]]]:
-        """Try to place a piece in a rectangle"""
-        length = piece['length']
-        width = piece['width']
-        
-        # Try normal orientation
-        if length <= rect.width and width <= rect.height:
-            if not piece['width_constraint'] and not piece['length_constraint']:
-                # No constraints, can place
-                return self._place_and_split(piece, rect, length, width, False)
-            elif piece['length_constraint'] and not piece['width_constraint']:
-                # Length must align with board length (x-axis)
-                return self._place_and_split(piece, rect, length, width, False)
-        
-        # Try rotated orientation (if no constraints)
-        if not piece['length_constraint'] and not piece['width_constraint']:
-            if width <= rect.width and length <= rect.height:
-                return self._place_and_split(piece, rect, width, length, True)
-        
-        return None
-    
-    def _place_and_split(self, piece: dict, rect: Rectangle, 
-                         placed_width: int, placed_height: int, 
-                         rotated: bool) -> Tuple[PlacedPiece, List[Rectangle]]:
-        """Place piece and create new free rectangles (guillotine cuts)"""
-        placed = PlacedPiece(
-            name=piece['name'],
-            length=placed_width,
-            width=placed_height,
-            x=rect.x,
-            y=rect.y,
-            rotated=rotated
-        )
-        
-        # Create new free rectangles using guillotine cuts
-        new_rects = []
-        
-        # Right rectangle
-        if rect.width > placed_width:
-            new_rects.append(Rectangle(
-                rect.x + placed_width,
-                rect.y,
-                rect.width - placed_width,
-                rect.height
-            ))
-        
-        # Top rectangle
-        if rect.height > placed_height:
-            new_rects.append(Rectangle(
-                rect.x,
-                rect.y + placed_height,
-                placed_width,
-                rect.height - placed_height
-            ))
-        
-        return placed, new_rects
-    
-    def _merge_rectangles(self, rectangles: List[Rectangle]) -> List[Rectangle]:
-        """Simplified rectangle merging - just remove tiny rectangles"""
-        return [r for r in rectangles if r.width > 10 and r.height > 10]
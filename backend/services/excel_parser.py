@@ -1,8 +1,33 @@
-import pandas as pd
+from operator import itemgetter
+from types import MappingProxyType
 from typing import List
+from python_calamine import CalamineWorkbook
 from models.schemas import Piece
 
 
+# Map Arabic column names
+_COLMAP = MappingProxyType({
+    'الاسم': 'name',
+    'الطول': 'length',
+    'العرض': 'width',
+    'الكمية': 'quantity',
+    'شريط طول': 'length_constraint',
+    'شريط عرض': 'width_constraint',
+    # Also support alternative names
+    'شرط طول': 'length_constraint',
+    'شرط عرض': 'width_constraint'
+})
+
+_REQUIRED_COLUMNS = ('name', 'length', 'width', 'quantity')
+
+
+def _column_getter(columns: dict, key: str):
+    """Return a row accessor for an optional column, reading False if it is missing"""
+    if key in columns:
+        return itemgetter(columns[key])
+    return lambda row: False
+
+
 class ExcelParser:
     """Parse Excel files with cutting piece data"""
     
@@ -18,40 +43,51 @@ class ExcelParser:
         - شريط عرض (Width constraint)
         """
         try:
-            df = pd.read_excel(file_path, sheet_name=0)
+            rows = CalamineWorkbook.from_path(file_path).get_sheet_by_index(0).to_python()
+            if not rows:
+                return []
             
-            # Map Arabic column names
-            column_map = {
-                'الاسم': 'name',
-                'الطول': 'length',
-                'العرض': 'width',
-                'الكمية': 'quantity',
-                'شريط طول': 'length_constraint',
-                'شريط عرض': 'width_constraint',
-                # Also support alternative names
-                'شرط طول': 'length_constraint',
-                'شرط عرض': 'width_constraint'
-            }
+            # Resolve column indices from the header row
+            columns = {}
+            for i, header in enumerate(rows[0]):
+                key = _COLMAP.get(str(header).strip())
+                if key is not None and key not in columns:
+                    columns[key] = i
             
-            # Rename columns
-            df = df.rename(columns=column_map)
+            missing = [key for key in _REQUIRED_COLUMNS if key not in columns]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
             
-            # Remove rows with missing essential data
-            df = df.dropna(subset=['name', 'length', 'width', 'quantity'])
+            # Row accessors resolved once from the column indices
+            get_required = itemgetter(*(columns[key] for key in _REQUIRED_COLUMNS))
+            get_length_constraint = _column_getter(columns, 'length_constraint')
+            get_width_constraint = _column_getter(columns, 'width_constraint')
             
             # Convert to pieces
             pieces = []
-            for _, row in df.iterrows():
+            for row in rows[1:]:
+                values = get_required(row)
+                
+                # Skip rows with missing essential data
+                if None in values or '' in values:
+                    continue
+                
+                name, length, width, quantity = values
+                
+                # Whole numbers are read as floats; keep names like "12" instead of "12.0"
+                if isinstance(name, float) and name.is_integer():
+                    name = int(name)
+                
                 pieces.append(Piece(
-                    name=str(row['name']),
-                    length=float(row['length']),
-                    width=float(row['width']),
-                    quantity=int(row['quantity']),
-                    length_constraint=bool(row.get('length_constraint', False)),
-                    width_constraint=bool(row.get('width_constraint', False))
+                    name=str(name),
+                    length=float(length),
+                    width=float(width),
+                    quantity=int(quantity),
+                    length_constraint=bool(get_length_constraint(row)),
+                    width_constraint=bool(get_width_constraint(row))
                 ))
             
             return pieces
-            
+        
         except Exception as e:
             raise ValueError(f"Error parsing Excel file: {str(e)}")
@@ -1,22 +1,42 @@
+from collections import Counter
 from io import BytesIO
-from typing import List
+from typing import List, Tuple
 from PIL import Image, ImageDraw, ImageFont
 from models.schemas import Board, CuttingResult
 
 
+# Load fonts once at import, fallback to default
+try:
+    _FONTS = {
+        'title': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24),
+        'header': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16),
+        'normal': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14),
+        'small': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10),
+    }
+except (OSError, ImportError):
+    _FONTS = dict.fromkeys(('title', 'header', 'normal', 'small'), ImageFont.load_default())
+
+
 class ReportGenerator:
     """Generates AutoCUT-style reports with visual layouts"""
     
     def __init__(self):
         self.margin = 40
-        self.scale = 0.15  # Scale factor for visualization (1mm = 0.15 pixels)
+        # Scale factor for visualization as integer fraction (1mm = 3/20 = 0.15 pixels)
+        self.scale_num, self.scale_den = 3, 20
+        self.title_font = _FONTS['title']
+        self.header_font = _FONTS['header']
+        self.normal_font = _FONTS['normal']
+        self.small_font = _FONTS['small']
+        # Rendered piece labels keyed by (name, length, width), shared by all boards
+        self._label_sprites = {}
         
     def generate_report(self, result: CuttingResult, material_name: str = "Material") -> BytesIO:
         """Generate complete report as PNG image"""
         
         # Calculate image dimensions
-        board_visual_width = int(result.boards[0].length * self.scale)
-        board_visual_height = int(result.boards[0].width * self.scale)
+        board_visual_width = self._sc(result.boards[0].length)
+        board_visual_height = self._sc(result.boards[0].width)
         
         # Estimate total height
         header_height = 200
@@ -25,43 +45,38 @@ class ReportGenerator:
         
         # Create image
         img_width = max(800, board_visual_width + 2 * self.margin)
-        img = Image.new('RGB', (img_width, total_height), 'white')
+        img = Image.new('L', (img_width, total_height), 'white')  # Report is black, gray and white only
         draw = ImageDraw.Draw(img)
         
-        # Try to load a font, fallback to default
-        try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-            header_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)
-            normal_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
-            small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10)
-        except:
-            title_font = ImageFont.load_default()
-            header_font = ImageFont.load_default()
-            normal_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
+        # Hatch pattern shared by all boards (same size)
+        hatch_tile = self._make_hatch_tile(board_visual_width, board_visual_height)
         
         y_offset = self.margin
         
         # Draw header
         y_offset = self._draw_header(draw, result, material_name, y_offset, 
-                                     img_width, title_font, header_font, normal_font)
+                                     img_width, self.title_font, self.header_font, self.normal_font)
         
         # Draw each board
         for board in result.boards:
-            y_offset = self._draw_board(draw, board, y_offset, img_width, 
-                                       board_visual_width, board_visual_height,
-                                       header_font, normal_font, small_font)
+            y_offset = self._draw_board(img, draw, board, y_offset, img_width, 
+                                       board_visual_width, board_visual_height, hatch_tile,
+                                       self.header_font, self.normal_font, self.small_font)
             y_offset += 50
         
         # Crop to actual content
         img = img.crop((0, 0, img_width, min(y_offset + 50, total_height)))
         
-        # Save to BytesIO
+        # Save to BytesIO (fast zlib level, the mostly-white image compresses well anyway)
         output = BytesIO()
-        img.save(output, format='PNG')
+        img.save(output, format='PNG', compress_level=1, optimize=False)
         output.seek(0)
         return output
     
+    def _sc(self, value: float) -> int:
+        """Scale a length in mm to pixels"""
+        return int(value) * self.scale_num // self.scale_den
+    
     def _draw_header(self, draw, result, material_name, y, width, 
                      title_font, header_font, normal_font):
         """Draw report header section"""
@@ -83,8 +98,8 @@ class ReportGenerator:
         
         return y
     
-    def _draw_board(self, draw, board: Board, y_start: int, img_width: int,
-                    board_visual_width: int, board_visual_height: int,
+    def _draw_board(self, img, draw, board: Board, y_start: int, img_width: int,
+                    board_visual_width: int, board_visual_height: int, hatch_tile,
                     header_font, normal_font, small_font):
         """Draw a single board with its pieces"""
         x_offset = self.margin
@@ -107,23 +122,13 @@ class ReportGenerator:
         table_y += 10
         
         # List pieces (grouped by name)
-        piece_counts = {}
-        for piece in board.pieces:
-            key = f"{piece.name}_{piece.length}_{piece.width}"
-            if key not in piece_counts:
-                piece_counts[key] = {
-                    'name': piece.name,
-                    'length': piece.length,
-                    'width': piece.width,
-                    'count': 0
-                }
-            piece_counts[key]['count'] += 1
-        
-        for piece_data in piece_counts.values():
-            draw.text((x_offset, table_y), piece_data['name'], fill='black', font=normal_font)
-            draw.text((x_offset + 150, table_y), str(piece_data['length']), fill='black', font=normal_font)
-            draw.text((x_offset + 250, table_y), str(piece_data['width']), fill='black', font=normal_font)
-            draw.text((x_offset + 350, table_y), str(piece_data['count']), fill='black', font=normal_font)
+        piece_counts = Counter((piece.name, piece.length, piece.width) for piece in board.pieces)
+        
+        for (name, length, width), count in piece_counts.items():
+            draw.text((x_offset, table_y), name, fill='black', font=normal_font)
+            draw.text((x_offset + 150, table_y), str(length), fill='black', font=normal_font)
+            draw.text((x_offset + 250, table_y), str(width), fill='black', font=normal_font)
+            draw.text((x_offset + 350, table_y), str(count), fill='black', font=normal_font)
             table_y += 20
         
         y_start = table_y + 20
@@ -132,6 +137,13 @@ class ReportGenerator:
         board_x = x_offset
         board_y = y_start
         
+        # Screen rectangles (x, y, w, h) of all pieces relative to the board
+        sc = self._sc
+        screen_rects = [(sc(p.x), sc(p.y), sc(p.length), sc(p.width)) for p in board.pieces]
+        
+        # Draw waste area (hatched pattern)
+        self._draw_waste_pattern(img, screen_rects, board_x, board_y, hatch_tile)
+        
         # Board outline
         draw.rectangle(
             [(board_x, board_y), 
@@ -141,11 +153,10 @@ class ReportGenerator:
         )
         
         # Draw placed pieces
-        for piece in board.pieces:
-            piece_x = board_x + int(piece.x * self.scale)
-            piece_y = board_y + int(piece.y * self.scale)
-            piece_w = int(piece.length * self.scale)
-            piece_h = int(piece.width * self.scale)
+        label_sprites = self._label_sprites
+        for piece, (piece_x, piece_y, piece_w, piece_h) in zip(board.pieces, screen_rects):
+            piece_x += board_x
+            piece_y += board_y
             
             # Draw piece rectangle
             draw.rectangle(
@@ -154,49 +165,47 @@ class ReportGenerator:
                 width=1
             )
             
-            # Draw piece label
-            label = f"{piece.name}\n{piece.length} x {piece.width}"
-            bbox = draw.textbbox((0, 0), label, font=small_font)
-            label_width = bbox[2] - bbox[0]
-            label_height = bbox[3] - bbox[1]
+            # Draw piece label (rendered and measured once per distinct piece, then stamped)
+            key = (piece.name, piece.length, piece.width)
+            sprite = label_sprites.get(key)
+            if sprite is None:
+                label = f"{piece.name}\n{piece.length} x {piece.width}"
+                sprite = label_sprites[key] = self._render_label(draw, label, small_font)
+            label_mask, label_left, label_top, label_width, label_height = sprite
             
             # Center label in piece
             label_x = piece_x + (piece_w - label_width) // 2
             label_y = piece_y + (piece_h - label_height) // 2
-            draw.text((label_x, label_y), label, fill='black', font=small_font)
-        
-        # Draw waste area (hatched pattern)
-        self._draw_waste_pattern(draw, board, board_x, board_y, 
-                                board_visual_width, board_visual_height)
+            draw.bitmap((label_x + label_left, label_y + label_top), label_mask, fill='black')
         
         return y_start + board_visual_height + 20
     
-    def _draw_waste_pattern(self, draw, board: Board, board_x: int, board_y: int,
-                           board_width: int, board_height: int):
-        """Draw hatched pattern for waste areas"""
-        # Create a simple hatching by drawing diagonal lines
-        # This is simplified - a more sophisticated version would identify actual waste rectangles
-        
-        # Calculate occupied area as rectangles
-        occupied = set()
-        for piece in board.pieces:
-            px_start = int(piece.x * self.scale)
-            py_start = int(piece.y * self.scale)
-            px_end = int((piece.x + piece.length) * self.scale)
-            py_end = int((piece.y + piece.width) * self.scale)
-            
-            for x in range(px_start, px_end, 5):
-                for y in range(py_start, py_end, 5):
-                    occupied.add((x, y))
+    def _render_label(self, draw, label: str, font):
+        """Render label text into a mask cropped to its bounding box (which can start left
+        of or above the text origin), returns (mask, left, top, width, height)"""
+        left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+        mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), label, fill=255, font=font)
+        return mask, left, top, right - left, bottom - top
+    
+    def _make_hatch_tile(self, board_width: int, board_height: int):
+        """Create board-sized mask with diagonal hatch lines"""
+        tile = Image.new('L', (board_width, board_height), 0)
+        tile_draw = ImageDraw.Draw(tile)
         
-        # Draw hatching in waste areas (simplified)
-        spacing = 10
+        spacing = 20
         for i in range(0, board_width + board_height, spacing):
-            x1 = board_x + i
-            y1 = board_y
-            x2 = board_x
-            y2 = board_y + i
-            
-            # Only draw if in waste area (very simplified check)
-            if i % (spacing * 2) == 0:  # Draw some hatch lines
-                draw.line([(x1, y1), (x2, y2)], fill='gray', width=1)
+            tile_draw.line([(i, 0), (0, i)], fill=255, width=1)
+        
+        return tile
+    
+    def _draw_waste_pattern(self, img, screen_rects: List[Tuple[int, int, int, int]],
+                            board_x: int, board_y: int, hatch_tile):
+        """Draw hatched pattern for waste areas"""
+        # Erase hatching under placed pieces so only waste areas are hatched
+        mask = hatch_tile.copy()
+        mask_draw = ImageDraw.Draw(mask)
+        for x, y, w, h in screen_rects:
+            mask_draw.rectangle([(x, y), (x + w, y + h)], fill=0)
+        
+        img.paste('gray', (board_x, board_y), mask)